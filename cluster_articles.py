@@ -4,18 +4,74 @@
 from dotenv import load_dotenv
 import os
 import json
+import hashlib
+import math
+import re
+import unicodedata
+import orjson
 import time
-import requests
+import logging
+import asyncio
+import aiohttp
+from collections import Counter
 from datetime import datetime
-from typing import Union, Dict, Any, List, Optional
-from dataclasses import dataclass
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, OperationFailure
+from itertools import islice
+from typing import Union, Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
+from functools import cached_property
+from pymongo import InsertOne, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import (
+    BulkWriteError,
+    ConnectionFailure,
+    OperationFailure,
+    PyMongoError,
+)
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
+from common import RateLimiter, create_api_session, post_with_retries, setup_logging
+from db import STANCES, get_client
 
 load_dotenv()
 
+logger = logging.getLogger("cluster_articles")
+
+# Article fields used to build the prompt and the cluster's article entry
+ARTICLE_PROJECTION = {
+    "_id": 1,
+    "url": 1,
+    "political_stance": 1,
+    "title": 1,
+    "subtitle": 1,
+    "summary": 1,
+    "content": 1,
+    "date": 1,
+}
+
+# Article text that decides its cluster, and so keys the cluster cache
+CLUSTER_CACHE_FIELDS = ("title", "subtitle", "summary", "content")
+
+# Instructions shared by every cluster-assignment request
+CLUSTER_SYSTEM_PROMPT = """You are a helpful assistant that determines which cluster each news article in a batch belongs to.
+If an article belongs to an existing cluster, use EXACTLY the name of that cluster.
+If an article doesn't belong to any existing cluster, create a new cluster name that consists of only relevant words or facts in Spanish.
+The cluster name should be concise and descriptive of the main topic or event.
+Articles in the same batch about the same event must get the same cluster name.
+Return ONLY a JSON object mapping each article id to its cluster name, e.g. {"<id>": "<cluster name>"}, with no explanation or additional text."""
+
+CLUSTER_SYSTEM_MESSAGE = {"role": "system", "content": CLUSTER_SYSTEM_PROMPT}
+
+# Cached cluster assignments expire after a week
+CLUSTER_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Spanish function words (unaccented) left out of locally generated cluster names
+SPANISH_STOPWORDS = frozenset(
+    """a al ante bajo cabe como con contra cual cuando de del desde donde durante
+    e el ella ellos en entre era es esa ese esta este estos estas fue han hacia
+    hasta la las le les lo los mas mientras muy ni no o para pero por que se
+    segun ser si sin sobre son su sus tambien tras u un una unas uno unos y ya""".split()
+)
+
 
 @dataclass
 class APIConfig:
@@ -31,7 +87,22 @@ class APIConfig:
     frequency_penalty: float = 0.2
     connect_timeout: int = 10
     read_timeout: int = 300
-    chunk_size: int = 8192
+    max_retries: int = 3
+    backoff_factor: float = 1.0
+    max_backoff: float = 30.0
+
+    @cached_property
+    def payload_template(self) -> Dict[str, Any]:
+        """Request fields shared by every clustering call, built once per run."""
+        return {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "top_p": self.top_p,
+            "presence_penalty": self.presence_penalty,
+            "frequency_penalty": self.frequency_penalty,
+            "response_format": {"type": "json_object"},
+        }
 
 
 class APIError(Exception):
@@ -52,19 +123,120 @@ class ResponseError(APIError):
     pass
 
 
-def get_timestamp() -> str:
-    """Get current timestamp in a consistent format."""
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+@dataclass
+class PendingWrites:
+    """Cluster and article writes buffered until the next bulk flush."""
+
+    # Article entries to push onto existing clusters, keyed by cluster id
+    cluster_pushes: Dict[ObjectId, List[Dict[str, Any]]] = field(default_factory=dict)
+    # New cluster documents, keyed by cluster name
+    new_clusters: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Article ids to tag with each cluster id once the cluster write succeeds
+    article_ids: Dict[ObjectId, List[ObjectId]] = field(default_factory=dict)
+    article_count: int = 0
+
+    def add_to_existing(
+        self, cluster_id: ObjectId, article_id: ObjectId, entry: Dict[str, Any]
+    ) -> None:
+        """Queue an article entry to be pushed onto an existing cluster."""
+        self.cluster_pushes.setdefault(cluster_id, []).append(entry)
+        self.article_ids.setdefault(cluster_id, []).append(article_id)
+        self.article_count += 1
+
+    def add_to_new(
+        self, cluster_name: str, article_id: ObjectId, entry: Dict[str, Any]
+    ) -> bool:
+        """Queue an article entry for a cluster created since the last flush.
+
+        The cluster `_id` is generated client-side so the article can be tagged
+        in the same flush. Returns True if a new cluster document was created.
+        """
+        new_cluster = self.new_clusters.get(cluster_name)
+        created = new_cluster is None
+        if new_cluster is None:
+            new_cluster = {
+                "_id": ObjectId(),
+                "name": cluster_name,
+                "articles": {"count": 0, "list": []},
+                "coverage": dict.fromkeys(STANCES, 0),
+                "created_at": datetime.now(),
+                "updated_at": datetime.now(),
+            }
+            self.new_clusters[cluster_name] = new_cluster
+
+        new_cluster["articles"]["list"].append(entry)
+        new_cluster["articles"]["count"] += 1
+        # Unknown or missing stances are left out of the coverage tally
+        stance = entry["political_stance"]
+        if stance in STANCES:
+            new_cluster["coverage"][stance] += 1
+        self.article_ids.setdefault(new_cluster["_id"], []).append(article_id)
+        self.article_count += 1
+        return created
+
+    def clear(self) -> None:
+        """Drop all buffered writes."""
+        self.cluster_pushes.clear()
+        self.new_clusters.clear()
+        self.article_ids.clear()
+        self.article_count = 0
+
+
+class ClusterNameIndex:
+    """Character-trigram TF-IDF index over cluster names.
+
+    Used to match articles against existing clusters locally, without a
+    DeepSeek call. Scores are cosine similarities in [0, 1].
+    """
+
+    def __init__(self, cluster_names: List[str]) -> None:
+        self.cluster_names = list(cluster_names)
+        name_trigrams = [char_trigrams(name) for name in self.cluster_names]
+
+        document_frequency: Counter = Counter()
+        for trigrams in name_trigrams:
+            document_frequency.update(trigrams.keys())
+        total = len(self.cluster_names)
+        self.idf = {
+            trigram: math.log((1 + total) / (1 + count)) + 1
+            for trigram, count in document_frequency.items()
+        }
+        self.unseen_idf = math.log(1 + total) + 1
+
+        # Inverted index of trigram -> [(cluster position, normalized weight)]
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        for position, trigrams in enumerate(name_trigrams):
+            weights = {
+                trigram: count * self.idf[trigram]
+                for trigram, count in trigrams.items()
+            }
+            norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+            for trigram, weight in weights.items():
+                self.postings.setdefault(trigram, []).append((position, weight / norm))
+
+    def __len__(self) -> int:
+        return len(self.cluster_names)
+
+    def top_matches(self, text: str, k: int = 1) -> List[Tuple[float, str]]:
+        """Return the `k` best matching cluster names for `text` as (score, name)."""
+        # Trigrams no cluster name contains still count towards the norm
+        weights = {
+            trigram: count * self.idf.get(trigram, self.unseen_idf)
+            for trigram, count in char_trigrams(text).items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        if not norm:
+            return []
 
+        scores: Dict[int, float] = {}
+        for trigram, weight in weights.items():
+            for position, cluster_weight in self.postings.get(trigram, []):
+                scores[position] = scores.get(position, 0.0) + weight * cluster_weight
 
-def print_step(message: str, start_time: Optional[float] = None) -> None:
-    """Print a step message with optional elapsed time."""
-    timestamp = get_timestamp()
-    if start_time:
-        elapsed = time.time() - start_time
-        print(f"[{timestamp}] {message} (Elapsed: {elapsed:.2f}s)")
-    else:
-        print(f"[{timestamp}] {message}")
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [
+            (score / norm, self.cluster_names[position]) for position, score in best
+        ]
 
 
 def get_api_config() -> APIConfig:
@@ -78,136 +250,611 @@ def get_api_config() -> APIConfig:
     return APIConfig(url=str(api_url), key=str(api_key))
 
 
-def prepare_cluster_payload(
-    article: Dict[str, Any], cluster_names: List[str], config: APIConfig
-) -> Dict[str, Any]:
-    """Prepare the API request payload for determining article cluster."""
-    # Create a copy of the article with ObjectId converted to string
-    article_copy = article.copy()
-    if "_id" in article_copy and isinstance(article_copy["_id"], ObjectId):
-        article_copy["_id"] = str(article_copy["_id"])
+def ensure_indexes(
+    clean_collection: Collection,
+    clusters_collection: Collection,
+    cache_collection: Collection,
+) -> None:
+    """Create the indexes used by the clustering queries, if missing."""
+    # Unclustered articles are fetched with {"cluster_id": None} in _id order;
+    # a regular (non-partial) index also covers articles without the field
+    clean_collection.create_index([("cluster_id", 1), ("_id", 1)])
 
-    # Convert any other ObjectId that might be in the article
-    for key, value in article_copy.items():
-        if isinstance(value, ObjectId):
-            article_copy[key] = str(value)
+    # Cluster names are resolved in memory, so let the server reject
+    # duplicates created by concurrent runs
+    try:
+        clusters_collection.create_index(
+            "name",
+            unique=True,
+            partialFilterExpression={"name": {"$type": "string"}},
+        )
+    except OperationFailure as e:
+        logger.warning("⚠️ Could not create unique index on cluster names: %s", e)
 
-    return {
-        "model": config.model,
-        "messages": [
+    # Expire cached cluster assignments so stale names eventually age out
+    cache_collection.create_index(
+        "created_at", expireAfterSeconds=CLUSTER_CACHE_TTL_SECONDS
+    )
+
+
+def backfill_coverage(clusters_collection: Collection) -> None:
+    """Recompute coverage from `articles.list` for clusters missing any stance.
+
+    Clusters created before coverage was tracked have none, and the `$inc` on
+    new articles would otherwise leave them with a partial count.
+    """
+    try:
+        result = clusters_collection.update_many(
             {
-                "role": "system",
-                "content": """You are a helpful assistant that determines which cluster a news article belongs to.
-                Your task is to analyze the article and determine if it belongs to an existing cluster or if a new cluster should be created.
-                If the article belongs to an existing cluster, return ONLY the name of that cluster.
-                If the article doesn't belong to any existing cluster, create a new cluster name that consists of only relevant words or facts in Spanish.
-                The cluster name should be concise and descriptive of the main topic or event.
-                DO NOT include any explanation or additional text, just the cluster name.""",
+                "articles.list": {"$type": "array"},
+                "$or": [
+                    {f"coverage.{stance}": {"$exists": False}} for stance in STANCES
+                ],
             },
+            [
+                {
+                    "$set": {
+                        "coverage": {
+                            stance: {
+                                "$size": {
+                                    "$filter": {
+                                        "input": "$articles.list",
+                                        "cond": {
+                                            "$eq": ["$$this.political_stance", stance]
+                                        },
+                                    }
+                                }
+                            }
+                            for stance in STANCES
+                        }
+                    }
+                }
+            ],
+        )
+    except OperationFailure as e:
+        # Pipeline updates need MongoDB 4.2+
+        logger.warning("⚠️ Could not backfill cluster coverage: %s", e)
+        return
+    if result.modified_count:
+        logger.info("📊 Backfilled coverage for %s clusters", result.modified_count)
+
+
+def article_entry(article: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the entry stored in a cluster's articles list."""
+    return {
+        "url": article["url"],
+        "political_stance": article.get("political_stance", "unknown"),
+    }
+
+
+def stance_counts(entries: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Count cluster entries per political stance, ignoring stances not in STANCES."""
+    return Counter(
+        entry["political_stance"]
+        for entry in entries
+        if entry["political_stance"] in STANCES
+    )
+
+
+def coverage_increments(coverage: Dict[str, int]) -> Dict[str, int]:
+    """Turn per-stance article counts into `$inc` fields on a cluster's coverage."""
+    return {f"coverage.{stance}": count for stance, count in coverage.items()}
+
+
+def merge_duplicate_clusters(
+    pending: PendingWrites,
+    duplicate_names: List[str],
+    clusters_collection: Collection,
+    clusters_by_name: Dict[str, ObjectId],
+) -> List[ObjectId]:
+    """Push new clusters rejected by the unique name index onto the existing ones.
+
+    Another run created a cluster with the same name since ours were loaded, so
+    the pending articles are re-pointed at it and `clusters_by_name` is fixed.
+    Returns the ids of the pending clusters that could not be merged.
+    """
+    existing_ids = {
+        cluster["name"]: cluster["_id"]
+        for cluster in clusters_collection.find(
+            {"name": {"$in": duplicate_names}}, {"name": 1}
+        )
+    }
+
+    failed_cluster_ids = []
+    merged = []
+    for name in duplicate_names:
+        new_cluster = pending.new_clusters[name]
+        if name not in existing_ids:
+            failed_cluster_ids.append(new_cluster["_id"])
+            continue
+        merged.append((new_cluster, existing_ids[name]))
+
+    merge_ops = [
+        UpdateOne(
+            {"_id": existing_id},
             {
-                "role": "user",
-                "content": f"""
-                Please analyze this article and determine which cluster it belongs to:
+                "$push": {"articles.list": {"$each": new_cluster["articles"]["list"]}},
+                "$inc": {
+                    "articles.count": new_cluster["articles"]["count"],
+                    **coverage_increments(new_cluster["coverage"]),
+                },
+                "$set": {"updated_at": datetime.now()},
+            },
+        )
+        for new_cluster, existing_id in merged
+    ]
+    if merge_ops:
+        try:
+            clusters_collection.bulk_write(merge_ops, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed_cluster_ids.append(merged[error["index"]][0]["_id"])
+                logger.error(
+                    "🔴 Error merging cluster %s: %s",
+                    merged[error["index"]][0]["name"],
+                    error.get("errmsg"),
+                )
+
+    for new_cluster, existing_id in merged:
+        if new_cluster["_id"] in failed_cluster_ids:
+            continue
+        pending.article_ids.setdefault(existing_id, []).extend(
+            pending.article_ids.pop(new_cluster["_id"])
+        )
+        clusters_by_name[new_cluster["name"]] = existing_id
+        logger.info("🔁 Merged into existing cluster: %s", new_cluster["name"])
+
+    return failed_cluster_ids
+
+
+def flush_pending_writes(
+    pending: PendingWrites,
+    clusters_collection: Collection,
+    clean_collection: Collection,
+    clusters_by_name: Dict[str, ObjectId],
+) -> Tuple[int, List[str]]:
+    """Write buffered clusters and article cluster_ids with unordered bulk writes.
+
+    Articles are only tagged with a cluster_id once the write to that cluster
+    succeeded. New clusters whose name already exists are merged into the
+    existing cluster. Returns the number of articles whose writes failed and
+    the names of the clusters that were not created or no longer exist.
+    """
+    if not pending.article_count:
+        return 0, []
+
+    new_cluster_names = {
+        new_cluster["_id"]: name for name, new_cluster in pending.new_clusters.items()
+    }
+    cluster_ids = []
+    cluster_ops: List[Union[InsertOne, UpdateOne]] = []
+    for new_cluster in pending.new_clusters.values():
+        cluster_ids.append(new_cluster["_id"])
+        cluster_ops.append(InsertOne(new_cluster))
+    for cluster_id, entries in pending.cluster_pushes.items():
+        cluster_ids.append(cluster_id)
+        cluster_ops.append(
+            UpdateOne(
+                {"_id": cluster_id},
+                {
+                    "$push": {"articles.list": {"$each": entries}},
+                    # Coverage is kept current as articles join, so it never
+                    # needs recomputing from the full article list
+                    "$inc": {
+                        "articles.count": len(entries),
+                        **coverage_increments(stance_counts(entries)),
+                    },
+                    "$set": {"updated_at": datetime.now()},
+                },
+            )
+        )
+
+    articles_failed = 0
+    failed_cluster_ids = set()
+    # Clusters that may not exist, whose names must not be reused
+    missing_cluster_ids = set()
+    try:
+        try:
+            result = clusters_collection.bulk_write(cluster_ops, ordered=False)
+            matched = result.matched_count
+        except BulkWriteError as e:
+            matched = e.details.get("nMatched", 0)
+            duplicate_names = []
+            for error in e.details.get("writeErrors", []):
+                cluster_id = cluster_ids[error["index"]]
+                if error.get("code") == 11000 and cluster_id in new_cluster_names:
+                    duplicate_names.append(new_cluster_names[cluster_id])
+                    continue
+                failed_cluster_ids.add(cluster_id)
+                logger.error(
+                    "🔴 Error writing cluster %s: %s", cluster_id, error.get("errmsg")
+                )
+            if duplicate_names:
+                failed_cluster_ids.update(
+                    merge_duplicate_clusters(
+                        pending, duplicate_names, clusters_collection, clusters_by_name
+                    )
+                )
+        missing_cluster_ids.update(
+            cluster_id
+            for cluster_id in failed_cluster_ids
+            if cluster_id in new_cluster_names
+        )
+
+        # A push that matched no document targeted a cluster that was deleted
+        # or never created, so its articles must not be tagged with it
+        if matched < len(pending.cluster_pushes):
+            existing_ids = {
+                cluster["_id"]
+                for cluster in clusters_collection.find(
+                    {"_id": {"$in": list(pending.cluster_pushes)}}, {"_id": 1}
+                )
+            }
+            for cluster_id in pending.cluster_pushes:
+                if cluster_id not in existing_ids:
+                    failed_cluster_ids.add(cluster_id)
+                    missing_cluster_ids.add(cluster_id)
+                    logger.error("🔴 Cluster %s no longer exists", cluster_id)
+
+        for cluster_id in failed_cluster_ids:
+            articles_failed += len(pending.article_ids[cluster_id])
+
+        article_updates = [
+            (article_id, cluster_id)
+            for cluster_id, article_ids in pending.article_ids.items()
+            if cluster_id not in failed_cluster_ids
+            for article_id in article_ids
+        ]
+        article_ops = [
+            UpdateOne({"_id": article_id}, {"$set": {"cluster_id": cluster_id}})
+            for article_id, cluster_id in article_updates
+        ]
+        if article_ops:
+            try:
+                clean_collection.bulk_write(article_ops, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    logger.error(
+                        "🔴 Error updating article %s: %s",
+                        article_updates[error["index"]][0],
+                        error.get("errmsg"),
+                    )
+                    articles_failed += 1
+
+        logger.info(
+            "💾 Wrote %s cluster changes and %s article updates",
+            len(cluster_ops),
+            len(article_ops),
+        )
+    except PyMongoError as e:
+        logger.error(
+            "🔴 Error flushing %s article writes: %s", pending.article_count, e
+        )
+        articles_failed = pending.article_count
+        missing_cluster_ids.update(new_cluster_names)
+    finally:
+        pending.clear()
+
+    failed_names = [
+        name
+        for name, cluster_id in clusters_by_name.items()
+        if cluster_id in missing_cluster_ids
+    ]
+    return articles_failed, failed_names
+
+
+def forget_clusters(
+    names: List[str], cluster_names: List[str], clusters_by_name: Dict[str, ObjectId]
+) -> None:
+    """Drop clusters whose write failed, so later articles create them afresh."""
+    for name in names:
+        clusters_by_name.pop(name, None)
+        cluster_names.remove(name)
+
+
+def iterate_unclustered(
+    clean_collection: Collection, unclustered_query: Dict[str, Any], window_size: int
+) -> Iterator[Dict[str, Any]]:
+    """Yield unclustered articles in _id order, fetching one window per query.
 
-                Article:
-                {json.dumps(article_copy, ensure_ascii=False)}
+    Each query resumes after the last _id seen, so no cursor stays open while
+    DeepSeek works through a window (which can outlast the server's idle
+    cursor timeout), and articles a failed window left unclustered are not
+    fetched again. Only the fields needed for the prompt and the cluster entry
+    are read.
+    """
+    last_id = None
+    while True:
+        query = (
+            unclustered_query
+            if last_id is None
+            else {**unclustered_query, "_id": {"$gt": last_id}}
+        )
+        window = list(
+            clean_collection.find(query, ARTICLE_PROJECTION)
+            .sort("_id", 1)
+            .limit(window_size)
+        )
+        yield from window
+        if len(window) < window_size:
+            return
+        last_id = window[-1]["_id"]
+
+
+def cluster_cache_key(article: Dict[str, Any], config: APIConfig) -> str:
+    """Hash the article text and model settings that determine its cluster.
+
+    Only the text fields are hashed, so copies of a story published under
+    different urls, dates or stances (e.g. wire stories) share a cache entry.
+    The existing cluster names are left out on purpose: the answer for a given
+    article is stable enough within a run.
+    """
+    content = {key: article.get(key) for key in CLUSTER_CACHE_FIELDS}
+    cache_input = {
+        "model": config.model,
+        "temperature": config.temperature,
+        "article": content,
+    }
+    return hashlib.sha256(
+        orjson.dumps(cache_input, default=str, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+def load_cached_clusters(
+    cache_collection: Collection, cache_keys: List[str]
+) -> Dict[str, str]:
+    """Return the cached cluster names for the given cache keys."""
+    try:
+        return {
+            entry["_id"]: entry["cluster_name"]
+            for entry in cache_collection.find({"_id": {"$in": cache_keys}})
+        }
+    except PyMongoError as e:
+        logger.warning("⚠️ Could not read cluster cache: %s", e)
+        return {}
+
+
+def save_cached_clusters(
+    cache_collection: Collection, cluster_names_by_key: Dict[str, str]
+) -> None:
+    """Store freshly determined cluster names in the cache."""
+    if not cluster_names_by_key:
+        return
+
+    now = datetime.now()
+    try:
+        cache_collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": cache_key},
+                    {"$setOnInsert": {"cluster_name": name, "created_at": now}},
+                    upsert=True,
+                )
+                for cache_key, name in cluster_names_by_key.items()
+            ],
+            ordered=False,
+        )
+    except PyMongoError as e:
+        logger.warning("⚠️ Could not write cluster cache: %s", e)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def char_trigrams(text: str) -> Counter:
+    """Count the character trigrams of the normalized text."""
+    padded = f" {normalize_text(text)} "
+    return Counter(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def article_match_text(article: Dict[str, Any]) -> str:
+    """Text used to match an article against cluster names locally."""
+    return " ".join(
+        str(article[key])
+        for key in ("title", "subtitle")
+        if isinstance(article.get(key), str)
+    )
 
-                Existing clusters:
-                {json.dumps(cluster_names, ensure_ascii=False)}
 
-                If the article belongs to an existing cluster, return ONLY the name of that cluster.
-                If the article doesn't belong to any existing cluster, create a new cluster name that consists of only relevant words or facts in Spanish.
-                The cluster name should be concise and descriptive of the main topic or event.
-                DO NOT include any explanation or additional text, just the cluster name.
-                """,
+def shortlist_cluster_names(
+    cluster_names: List[str], candidates: Iterable[List[str]]
+) -> List[str]:
+    """Union of per-article candidate names, in `cluster_names` order.
+
+    Each batch gets a different subset, so shortlisted prompts do not share
+    the full, append-only cluster list that DeepSeek's prompt cache reuses.
+    """
+    wanted = {name for names in candidates for name in names}
+    if len(wanted) >= len(cluster_names):
+        return cluster_names
+    return [name for name in cluster_names if name in wanted]
+
+
+def keyword_cluster_name(article: Dict[str, Any], max_words: int = 8) -> Optional[str]:
+    """Build a cluster name from the content words of the article title."""
+    title = article.get("title")
+    if not isinstance(title, str):
+        return None
+    keywords = [
+        word
+        for word in re.findall(r"[\w-]+", title)
+        if normalize_text(word) not in SPANISH_STOPWORDS
+    ]
+    return " ".join(keywords[:max_words]) or None
+
+
+def chunked(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield successive lists of at most `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def token_budgeted_batches(
+    items: Iterable[Tuple[int, Dict[str, Any]]], max_articles: int, max_tokens: int
+) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    """Yield batches of at most `max_articles` articles and about `max_tokens` tokens.
+
+    Tokens are estimated as a quarter of the article's field lengths, so the
+    article is only serialized once, when its prompt is built. An article over
+    the budget on its own still gets a batch to itself.
+    """
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    batch_tokens = 0
+    for item in items:
+        tokens = sum(len(str(value)) for value in item[1].values()) // 4
+        if batch and (len(batch) >= max_articles or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def prepare_cluster_payload(
+    articles: List[Dict[str, Any]], cluster_names: List[str], config: APIConfig
+) -> Dict[str, Any]:
+    """Prepare the API request payload for determining the cluster of a batch of articles.
+
+    The system prompt and cluster list come first so DeepSeek can serve them
+    from its prefix cache; only the trailing articles message changes between
+    calls. New clusters are appended one per line, which extends the cached
+    prefix instead of invalidating it.
+    """
+    article_blocks = []
+    for i, article in enumerate(articles):
+        # ObjectIds (and any other non-JSON values) are serialized as strings
+        article_blocks.append(
+            f"Article {i} (id={article.get('_id', 'N/A')}):\n"
+            f"{orjson.dumps(article, default=str).decode()}"
+        )
+    articles_text = "\n\n".join(article_blocks)
+
+    return {
+        **config.payload_template,
+        "messages": [
+            CLUSTER_SYSTEM_MESSAGE,
+            {
+                "role": "user",
+                "content": "Existing clusters:\n" + "\n".join(cluster_names),
             },
+            {"role": "user", "content": f"Articles:\n\n{articles_text}"},
         ],
-        "temperature": config.temperature,
-        "max_tokens": config.max_tokens,
-        "top_p": config.top_p,
-        "presence_penalty": config.presence_penalty,
-        "frequency_penalty": config.frequency_penalty,
-        "response_format": {"type": "text"},
     }
 
 
-def determine_cluster(
-    article: Dict[str, Any],
+async def determine_clusters_batch(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    rate_limiter: RateLimiter,
+    batch: List[Tuple[int, Dict[str, Any]]],
     cluster_names: List[str],
     config: APIConfig,
-    article_index: int,
     total_articles: int,
-) -> str:
-    """Determine which cluster an article belongs to using DeepSeek AI."""
+) -> Dict[str, str]:
+    """Determine which cluster each article of a batch belongs to using DeepSeek AI.
+
+    `batch` holds `(article_index, article)` pairs. Returns a mapping of article
+    id (as a string) to cluster name; articles missing from the mapping failed.
+    """
+    first_index, last_index = batch[0][0], batch[-1][0]
+    article_ids = [str(article.get("_id", "N/A")) for _, article in batch]
     try:
-        print_step(
-            f"💭 {article_index}/{total_articles}\tID: {article.get('_id', 'N/A')}"
+        payload = prepare_cluster_payload(
+            [article for _, article in batch], cluster_names, config
         )
 
-        payload = prepare_cluster_payload(article, cluster_names, config)
-        headers = {
-            "Authorization": f"Bearer {config.key}",
-            "Content-Type": "application/json",
-        }
-
-        response = requests.post(
-            config.url,
-            json=payload,
-            headers=headers,
-            timeout=config.read_timeout,
+        logger.info(
+            "💭 %s-%s/%s\tBatch of %s articles",
+            first_index,
+            last_index,
+            total_articles,
+            len(batch),
+        )
+        response_data = orjson.loads(
+            await post_with_retries(
+                session, orjson.dumps(payload), config, semaphore, rate_limiter
+            )
         )
-        response.raise_for_status()
-        response_data = response.json()
 
-        # Extract the cluster name from the first choice's message content
+        # Extract the id -> cluster name mapping from the first choice's message content
         if "choices" in response_data and len(response_data["choices"]) > 0:
-            cluster_name = response_data["choices"][0]["message"]["content"].strip()
-            print_step(
-                f"🪣  {article_index}/{total_articles}\tID: {article.get('_id', 'N/A')}\tCluster: {cluster_name}"
-            )
-            return cluster_name
+            content = response_data["choices"][0]["message"]["content"]
+            assignments = orjson.loads(content)
+            if not isinstance(assignments, dict):
+                raise ResponseError(f"Expected a JSON object, got: {content}")
+
+            cluster_names_by_id = {}
+            for (i, _), article_id in zip(batch, article_ids):
+                cluster_name = assignments.get(article_id)
+                if not isinstance(cluster_name, str) or not cluster_name.strip():
+                    logger.warning(
+                        "⚠️ %s/%s\tID: %s\tMissing from API response",
+                        i,
+                        total_articles,
+                        article_id,
+                    )
+                    continue
+                cluster_names_by_id[article_id] = cluster_name.strip()
+                logger.info(
+                    "🪣  %s/%s\tID: %s\tCluster: %s",
+                    i,
+                    total_articles,
+                    article_id,
+                    cluster_names_by_id[article_id],
+                )
+            return cluster_names_by_id
         else:
-            error_msg = f"API Response missing choices. Response: {json.dumps(response_data, indent=2)}"
-            print_step(f"🔴 Error in article {article_index}: {error_msg}")
+            error_msg = f"API Response missing choices. Response: {orjson.dumps(response_data, default=str).decode()}"
+            logger.error(
+                "🔴 Error in batch %s-%s: %s", first_index, last_index, error_msg
+            )
             raise ResponseError(error_msg)
 
-    except requests.RequestException as e:
-        error_msg = f"Network error while processing article {article_index}: {str(e)}"
-        print_step(f"🔴 {error_msg}")
-        print_step(
-            f"🔴 Article content that caused the error: {json.dumps(article, indent=2, ensure_ascii=False)}"
+    except aiohttp.ClientResponseError as e:
+        # Non-retryable statuses (e.g. 400/401) and retries exhausted on 429/5xx
+        error_msg = f"API error (HTTP {e.status}) while processing batch {first_index}-{last_index}: {e.message}"
+        logger.error("🔴 %s", error_msg)
+        logger.error("🔴 Articles that caused the error: %s", article_ids)
+        return {}
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        error_msg = (
+            f"Network error while processing batch {first_index}-{last_index}: {str(e)}"
         )
-        return "error"
+        logger.error("🔴 %s", error_msg)
+        logger.error("🔴 Articles that caused the error: %s", article_ids)
+        return {}
     except json.JSONDecodeError as e:
-        error_msg = f"JSON parsing error in article {article_index}: {str(e)}"
-        print_step(f"🔴 {error_msg}")
-        print_step(
-            f"🔴 Article content that caused the error: {json.dumps(article, indent=2, ensure_ascii=False)}"
-        )
-        return "error"
+        error_msg = f"JSON parsing error in batch {first_index}-{last_index}: {str(e)}"
+        logger.error("🔴 %s", error_msg)
+        logger.error("🔴 Articles that caused the error: %s", article_ids)
+        return {}
     except ResponseError as e:
-        error_msg = f"API response error in article {article_index}: {str(e)}"
-        print_step(f"🔴 {error_msg}")
-        print_step(
-            f"🔴 Article content that caused the error: {json.dumps(article, indent=2, ensure_ascii=False)}"
-        )
-        return "error"
+        error_msg = f"API response error in batch {first_index}-{last_index}: {str(e)}"
+        logger.error("🔴 %s", error_msg)
+        logger.error("🔴 Articles that caused the error: %s", article_ids)
+        return {}
     except Exception as e:
-        error_msg = f"Unexpected error processing article {article_index}: {str(e)}"
-        print_step(f"🔴 {error_msg}")
-        print_step(f"🔴 Error type: {type(e).__name__}")
-        print_step(
-            f"🔴 Article content that caused the error: {json.dumps(article, indent=2, ensure_ascii=False)}"
+        error_msg = (
+            f"Unexpected error processing batch {first_index}-{last_index}: {str(e)}"
         )
-        return "error"
+        logger.error("🔴 %s", error_msg)
+        logger.error("🔴 Error type: %s", type(e).__name__)
+        logger.error("🔴 Articles that caused the error: %s", article_ids)
+        return {}
 
 
-def cluster_articles() -> None:
+async def cluster_articles() -> None:
     """Load articles from articles collection and assign them to clusters."""
     start_time = time.time()
-    print_step("Starting article clustering process")
+    logger.info("Starting article clustering process")
 
-    client = None
     try:
         config = get_api_config()
 
@@ -216,6 +863,7 @@ def cluster_articles() -> None:
         mongo_db_name = os.getenv("MONGODB_DB")
         mongo_clean_col_name = "articles"
         mongo_clusters_col_name = "clusters"
+        mongo_cache_col_name = "cluster_cache"
 
         if not all([mongo_uri, mongo_db_name]):
             raise ConfigurationError(
@@ -223,34 +871,51 @@ def cluster_articles() -> None:
             )
 
         try:
-            client = MongoClient(mongo_uri)
+            client = get_client()
             db = client[str(mongo_db_name)]
             clean_collection = db[mongo_clean_col_name]
             clusters_collection = db[mongo_clusters_col_name]
+            cache_collection = db[mongo_cache_col_name]
             # Test connection
             client.admin.command("ping")
-            print_step(f"Successfully connected to MongoDB database '{mongo_db_name}'.")
-            print_step(
-                f"Using clean collection: '{mongo_clean_col_name}' and clusters collection: '{mongo_clusters_col_name}'"
+            logger.info(
+                "Successfully connected to MongoDB database '%s'.", mongo_db_name
+            )
+            logger.info(
+                "Using clean collection: '%s' and clusters collection: '%s'",
+                mongo_clean_col_name,
+                mongo_clusters_col_name,
             )
         except ConnectionFailure as e:
             raise ConfigurationError(f"Could not connect to MongoDB: {e}")
         # --- End MongoDB Connection ---
 
-        # 1. Load all articles from the articles collection
-        print_step("Loading articles from articles collection...")
-        articles = list(clean_collection.find())
-        total_articles = len(articles)
-        print_step(f"Loaded {total_articles} articles from articles collection")
-
-        # 2. Load all cluster names from the clusters collection
-        print_step("Loading cluster names from clusters collection...")
-        clusters = list(clusters_collection.find())
-        cluster_names = [
-            cluster.get("name", "") for cluster in clusters if "name" in cluster
-        ]
-        print_step(
-            f"Loaded {len(cluster_names)} cluster names from clusters collection"
+        ensure_indexes(clean_collection, clusters_collection, cache_collection)
+        backfill_coverage(clusters_collection)
+
+        # 1. Count the articles that are not in a cluster yet; they are
+        # streamed from the cursor below as the windows are processed
+        unclustered_query = {"cluster_id": None}
+        total_articles = clean_collection.count_documents(unclustered_query)
+        logger.info(
+            "Found %s unclustered articles in articles collection", total_articles
+        )
+
+        # 2. Load all cluster names from the clusters collection, keeping a
+        # name -> id map so assignments never need a lookup query. Creation
+        # order keeps the prompt's cluster list append-only across runs.
+        # Legacy clusters with a null or non-string name are left out, as in
+        # the unique name index, since they cannot be matched by name.
+        logger.info("Loading cluster names from clusters collection...")
+        clusters_by_name: Dict[str, ObjectId] = {
+            cluster["name"]: cluster["_id"]
+            for cluster in clusters_collection.find(
+                {"name": {"$type": "string"}}, {"name": 1}
+            ).sort("_id", 1)
+        }
+        cluster_names = list(clusters_by_name)
+        logger.info(
+            "Loaded %s cluster names from clusters collection", len(cluster_names)
         )
 
         # Track statistics
@@ -258,139 +923,281 @@ def cluster_articles() -> None:
         articles_added_to_existing = 0
         new_clusters_created = 0
         articles_failed = 0
-        articles_skipped = 0
-
-        # Process articles
-        for i, article in enumerate(articles, 1):
-            # Skip articles that are already in a cluster
-            if article.get("cluster_id"):
-                articles_processed += 1
-                articles_skipped += 1
-                continue
-
-            # Determine which cluster the article belongs to
-            cluster_name = determine_cluster(
-                article,
-                cluster_names,
-                config,
-                i,
-                total_articles,
-            )
 
-            if cluster_name == "error":
-                articles_failed += 1
-                continue
-
-            # Check if the cluster exists
-            cluster = clusters_collection.find_one({"name": cluster_name})
+        # Process articles in batches of BATCH_SIZE per LLM call, with up to
+        # LLM_CONCURRENCY calls in flight per window. Cluster assignments for a
+        # window are applied once all of its calls have returned, so the next
+        # window already sees the clusters created by this one.
+        batch_size = int(os.getenv("BATCH_SIZE", "8"))
+        # Batches of long articles are split further so the prompt stays well
+        # inside the context window and the reply inside max_tokens
+        batch_token_budget = int(os.getenv("BATCH_TOKEN_BUDGET", "24000"))
+        max_concurrent_tasks = int(os.getenv("LLM_CONCURRENCY", "16"))
+        semaphore = asyncio.Semaphore(max_concurrent_tasks)
+        # Optional provider limits; 0 leaves that dimension unlimited
+        rate_limiter = RateLimiter(
+            requests_per_minute=int(os.getenv("LLM_RPM", "0")),
+            tokens_per_minute=int(os.getenv("LLM_TPM", "0")),
+        )
+        # Cluster and article writes are buffered and flushed with bulk_write
+        # once WRITE_BATCH_SIZE articles are pending
+        write_batch_size = int(os.getenv("WRITE_BATCH_SIZE", "200"))
+        pending_writes = PendingWrites()
+        window_size = batch_size * max_concurrent_tasks
+        # Articles whose title is at least this similar to an existing cluster
+        # name are assigned without asking DeepSeek
+        match_threshold = float(os.getenv("CLUSTER_MATCH_THRESHOLD", "0.75"))
+        # Articles less similar than this to every existing cluster start a new
+        # cluster named from their title keywords. Off by default: a headline
+        # and the name of the cluster it belongs to often score below 0.25,
+        # so low scorers still go to DeepSeek with their shortlist.
+        new_cluster_threshold = float(os.getenv("CLUSTER_NEW_THRESHOLD", "0"))
+        cluster_name_index = ClusterNameIndex(cluster_names)
+        # Optionally send DeepSeek only the closest cluster names per article.
+        # Off by default: headline/name scores are too low to trust (see
+        # CLUSTER_NEW_THRESHOLD), so the right cluster could be cut and then
+        # duplicated, and every name keeps the prompt prefix cacheable.
+        shortlist_size = int(os.getenv("CLUSTER_SHORTLIST_SIZE", "0"))
 
-            if cluster:
-                # Update existing cluster
-                try:
-                    # Add article to the cluster's articles list
-                    update_result = clusters_collection.update_one(
-                        {"_id": cluster["_id"]},
-                        {
-                            "$push": {
-                                "articles.list": {
-                                    "url": article["url"],
-                                    "political_stance": (
-                                        article["political_stance"]
-                                        if "political_stance" in article
-                                        else "unknown"
-                                    ),
-                                }
-                            },
-                            "$inc": {"articles.count": 1},
-                            "$set": {"updated_at": datetime.now()},
-                        },
-                    )
+        unclustered_articles = iterate_unclustered(
+            clean_collection, unclustered_query, window_size
+        )
 
-                    # Update the article with the cluster_id
-                    clean_collection.update_one(
-                        {"_id": article["_id"]},
-                        {"$set": {"cluster_id": cluster["_id"]}},
+        # Buffered writes are flushed even if a window fails, so DeepSeek work
+        # already done is not lost
+        try:
+            async with create_api_session(config, max_concurrent_tasks) as session:
+                for window in chunked(enumerate(unclustered_articles, 1), window_size):
+                    # Reuse cached assignments and only ask DeepSeek about the rest
+                    cache_keys = {
+                        str(article["_id"]): cluster_cache_key(article, config)
+                        for _, article in window
+                    }
+                    cached_clusters = load_cached_clusters(
+                        cache_collection, list(set(cache_keys.values()))
                     )
+                    assignments = {
+                        article_id: cached_clusters[cache_key]
+                        for article_id, cache_key in cache_keys.items()
+                        if cache_key in cached_clusters
+                    }
+                    if assignments:
+                        logger.info(
+                            "♻️ Reusing %s cached cluster assignments", len(assignments)
+                        )
 
-                    if update_result.modified_count > 0:
-                        print_step(
-                            f"🟢 {i}/{total_articles}\tID: {article.get('_id', 'N/A')}\t➕Added to existing cluster: {cluster_name}"
+                    # Assign articles that closely match an existing cluster name
+                    # locally; only the rest need DeepSeek
+                    if len(cluster_name_index) != len(cluster_names):
+                        cluster_name_index = ClusterNameIndex(cluster_names)
+                    uncached = []
+                    candidates: Dict[str, List[str]] = {}
+                    # Names created locally in this window, so articles about the
+                    # same new story end up together
+                    local_name_index = ClusterNameIndex([])
+                    for i, article in window:
+                        article_id = str(article["_id"])
+                        if article_id in assignments:
+                            continue
+                        match_text = article_match_text(article)
+                        matches = cluster_name_index.top_matches(
+                            match_text, max(shortlist_size, 1)
                         )
-                        articles_added_to_existing += 1
-                    else:
-                        print_step(
-                            f"⚠️ {i}/{total_articles}\tID: {article.get('_id', 'N/A')}\tFailed to add to cluster: {cluster_name}"
+                        best_score = matches[0][0] if matches else 0.0
+                        keyword_name = (
+                            keyword_cluster_name(article)
+                            if len(cluster_name_index)
+                            and best_score < new_cluster_threshold
+                            else None
                         )
-                        articles_failed += 1
-                except Exception as e:
-                    print_step(f"🔴 Error updating cluster {cluster_name}: {str(e)}")
-                    articles_failed += 1
-            else:
-                # Create new cluster
-                try:
-                    # Create a new cluster document
-                    new_cluster = {
-                        "name": cluster_name,
-                        "articles": {
-                            "count": 1,
-                            "list": [
-                                {
-                                    "url": article["url"],
-                                    "political_stance": (
-                                        article["political_stance"]
-                                        if "political_stance" in article
-                                        else "unknown"
-                                    ),
-                                }
-                            ],
-                        },
-                        "created_at": datetime.now(),
-                        "updated_at": datetime.now(),
-                    }
+                        if best_score >= match_threshold:
+                            cluster_name = matches[0][1]
+                            assignments[article_id] = cluster_name
+                            logger.info(
+                                "🎯 %s/%s\tID: %s\tMatched locally (%.2f): %s",
+                                i,
+                                total_articles,
+                                article_id,
+                                best_score,
+                                cluster_name,
+                            )
+                        elif keyword_name:
+                            local_matches = local_name_index.top_matches(match_text)
+                            if local_matches and local_matches[0][0] >= match_threshold:
+                                cluster_name = local_matches[0][1]
+                            else:
+                                cluster_name = keyword_name
+                                local_name_index = ClusterNameIndex(
+                                    local_name_index.cluster_names + [cluster_name]
+                                )
+                            assignments[article_id] = cluster_name
+                            logger.info(
+                                "🌱 %s/%s\tID: %s\tNo close cluster (%.2f), named locally: %s",
+                                i,
+                                total_articles,
+                                article_id,
+                                best_score,
+                                cluster_name,
+                            )
+                        else:
+                            uncached.append((i, article))
+                            candidates[article_id] = [name for _, name in matches]
 
-                    # Insert the new cluster
-                    insert_result = clusters_collection.insert_one(new_cluster)
+                    # Determine which cluster each remaining article belongs to
+                    batches = list(
+                        token_budgeted_batches(uncached, batch_size, batch_token_budget)
+                    )
+                    batch_cluster_names = [
+                        (
+                            shortlist_cluster_names(
+                                cluster_names,
+                                (
+                                    candidates[str(article["_id"])]
+                                    for _, article in batch
+                                ),
+                            )
+                            if shortlist_size
+                            else cluster_names
+                        )
+                        for batch in batches
+                    ]
+                    results = await asyncio.gather(
+                        *[
+                            determine_clusters_batch(
+                                session,
+                                semaphore,
+                                rate_limiter,
+                                batch,
+                                names,
+                                config,
+                                total_articles,
+                            )
+                            for batch, names in zip(batches, batch_cluster_names)
+                        ],
+                        return_exceptions=True,
+                    )
 
-                    # Update the article with the cluster_id
-                    clean_collection.update_one(
-                        {"_id": article["_id"]},
-                        {"$set": {"cluster_id": insert_result.inserted_id}},
+                    fresh_assignments = {}
+                    for batch, batch_assignments in zip(batches, results):
+                        if isinstance(batch_assignments, BaseException):
+                            logger.error(
+                                "🔴 Error processing batch %s-%s: %s",
+                                batch[0][0],
+                                batch[-1][0],
+                                batch_assignments,
+                            )
+                            continue
+                        fresh_assignments.update(batch_assignments)
+                    assignments.update(fresh_assignments)
+                    save_cached_clusters(
+                        cache_collection,
+                        {
+                            cache_keys[article_id]: name
+                            for article_id, name in fresh_assignments.items()
+                        },
                     )
 
-                    # Add the new cluster name to our list
-                    cluster_names.append(cluster_name)
+                    for i, article in window:
+                        cluster_name = assignments.get(str(article["_id"]))
+                        if not cluster_name:
+                            articles_failed += 1
+                            continue
 
-                    print_step(
-                        f"🟢 {i}/{total_articles}\tID: {article.get('_id', 'N/A')}\t🆕Created new cluster: {cluster_name}"
-                    )
-                    new_clusters_created += 1
-                except Exception as e:
-                    print_step(
-                        f"🔴 Error creating new cluster {cluster_name}: {str(e)}"
-                    )
-                    articles_failed += 1
+                        try:
+                            entry = article_entry(article)
+                        except KeyError as e:
+                            logger.error(
+                                "🔴 %s/%s\tID: %s\tMissing field: %s",
+                                i,
+                                total_articles,
+                                article.get("_id", "N/A"),
+                                e,
+                            )
+                            articles_failed += 1
+                            continue
+
+                        # Clusters created since the last flush only exist in the
+                        # pending writes, so articles join their pending document
+                        cluster_id = clusters_by_name.get(cluster_name)
+                        if (
+                            cluster_id is not None
+                            and cluster_name not in pending_writes.new_clusters
+                        ):
+                            pending_writes.add_to_existing(
+                                cluster_id, article["_id"], entry
+                            )
+                            created = False
+                        else:
+                            created = pending_writes.add_to_new(
+                                cluster_name, article["_id"], entry
+                            )
+
+                        if created:
+                            # Add the new cluster to our name list and map
+                            cluster_names.append(cluster_name)
+                            clusters_by_name[cluster_name] = (
+                                pending_writes.new_clusters[cluster_name]["_id"]
+                            )
+                            logger.info(
+                                "🟢 %s/%s\tID: %s\t🆕Created new cluster: %s",
+                                i,
+                                total_articles,
+                                article.get("_id", "N/A"),
+                                cluster_name,
+                            )
+                            new_clusters_created += 1
+                        else:
+                            logger.info(
+                                "🟢 %s/%s\tID: %s\t➕Added to existing cluster: %s",
+                                i,
+                                total_articles,
+                                article.get("_id", "N/A"),
+                                cluster_name,
+                            )
+                            articles_added_to_existing += 1
 
-            articles_processed += 1
+                        articles_processed += 1
 
-        print_step(
-            f"Finished clustering. ✅Processed: {articles_processed - articles_skipped}, ✅Added to existing: {articles_added_to_existing}, ✅New clusters: {new_clusters_created}, ❌Failed: {articles_failed}, ⏩Skipped: {articles_skipped}",
-            start_time,
+                    if pending_writes.article_count >= write_batch_size:
+                        flush_failed, failed_names = flush_pending_writes(
+                            pending_writes,
+                            clusters_collection,
+                            clean_collection,
+                            clusters_by_name,
+                        )
+                        articles_failed += flush_failed
+                        if failed_names:
+                            forget_clusters(
+                                failed_names, cluster_names, clusters_by_name
+                            )
+                            cluster_name_index = ClusterNameIndex(cluster_names)
+        finally:
+            flush_failed, _ = flush_pending_writes(
+                pending_writes, clusters_collection, clean_collection, clusters_by_name
+            )
+            articles_failed += flush_failed
+
+        logger.info(
+            "Finished clustering. ✅Processed: %s, ✅Added to existing: %s, ✅New clusters: %s, ❌Failed: %s (Elapsed: %.2fs)",
+            articles_processed,
+            articles_added_to_existing,
+            new_clusters_created,
+            articles_failed,
+            time.time() - start_time,
         )
 
     except ConfigurationError as e:
         raise e
     except Exception as e:
         raise APIError(f"Error during article clustering process: {str(e)}")
-    finally:
-        # Ensure MongoDB client is closed if it was initialized
-        if client:
-            client.close()
-            print_step("MongoDB connection closed.")
 
 
 if __name__ == "__main__":
+    log_listener = setup_logging()
     try:
-        cluster_articles()
-        print_step("Article clustering process completed successfully.")
+        asyncio.run(cluster_articles())
+        logger.info("Article clustering process completed successfully.")
     except Exception as e:
-        print_step(f"An error occurred in the main execution block: {str(e)}")
+        logger.error("An error occurred in the main execution block: %s", e)
+    finally:
+        log_listener.stop()
@@ -0,0 +1,175 @@
+# Helpers shared by the pipeline scripts: queued logging and the DeepSeek HTTP
+# client with rate limiting and retries.
+
+import asyncio
+import logging
+import math
+import os
+import queue
+import random
+import sys
+import time
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+from typing import Deque, Optional, Protocol, Tuple
+
+import aiohttp
+
+logger = logging.getLogger("common")
+
+# Transient DeepSeek responses that are worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RequestConfig(Protocol):
+    """DeepSeek endpoint and retry settings, as provided by each script's APIConfig."""
+
+    url: str
+    key: str
+    connect_timeout: int
+    read_timeout: int
+    max_retries: int
+    backoff_factor: float
+    max_backoff: float
+
+
+class RateLimiter:
+    """Sliding one-minute window over DeepSeek requests and prompt tokens.
+
+    Prompt tokens are estimated as one token per four bytes of request body.
+    A limit of 0 disables that dimension.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window: Deque[Tuple[float, int]] = deque()
+        self.window_tokens = 0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until a request of `tokens` estimated tokens fits in the window."""
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+
+        # Waiters queue on the lock, so requests are admitted in FIFO order
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.window and now - self.window[0][0] >= 60:
+                    _, expired_tokens = self.window.popleft()
+                    self.window_tokens -= expired_tokens
+
+                fits_requests = (
+                    not self.requests_per_minute
+                    or len(self.window) < self.requests_per_minute
+                )
+                # A single oversized request is let through on an empty window
+                fits_tokens = (
+                    not self.tokens_per_minute
+                    or not self.window
+                    or self.window_tokens + tokens <= self.tokens_per_minute
+                )
+                if fits_requests and fits_tokens:
+                    self.window.append((now, tokens))
+                    self.window_tokens += tokens
+                    return
+
+                await asyncio.sleep(60 - (now - self.window[0][0]))
+
+
+def setup_logging() -> QueueListener:
+    """Send log records through a queue drained by a background thread.
+
+    Callers only enqueue records, so an event loop never blocks on stdout.
+    The level comes from LOG_LEVEL (default INFO). The returned listener must
+    be stopped to flush the remaining records.
+    """
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S")
+    )
+    root_logger = logging.getLogger()
+    root_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root_logger.addHandler(QueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
+
+
+def create_api_session(config: RequestConfig, pool_size: int) -> aiohttp.ClientSession:
+    """Create the DeepSeek HTTP session, reusing keep-alive connections."""
+    connector = aiohttp.TCPConnector(
+        limit=pool_size,
+        limit_per_host=pool_size,
+        keepalive_timeout=60,
+        ttl_dns_cache=300,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={
+            "Authorization": f"Bearer {config.key}",
+            "Content-Type": "application/json",
+        },
+    )
+
+
+def get_retry_delay(response: aiohttp.ClientResponse, backoff: float) -> float:
+    """Use the server's Retry-After (in seconds) when present, else `backoff`."""
+    try:
+        retry_after = float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        # Missing, or an HTTP date rather than a number of seconds
+        return backoff
+    return retry_after if math.isfinite(retry_after) and retry_after >= 0 else backoff
+
+
+async def post_with_retries(
+    session: aiohttp.ClientSession,
+    body: bytes,
+    config: RequestConfig,
+    semaphore: asyncio.Semaphore,
+    rate_limiter: Optional[RateLimiter] = None,
+) -> bytes:
+    """POST a request body to the DeepSeek API and return the raw response body.
+
+    Every attempt waits for room in `rate_limiter`, if given. Only the HTTP
+    exchange holds a `semaphore` slot, not the backoff sleep. Connection
+    errors, timeouts and 429/5xx responses are retried up to
+    `config.max_retries` times with capped exponential backoff plus jitter.
+    """
+    estimated_tokens = len(body) // 4
+    for attempt in range(config.max_retries + 1):
+        # Jitter keeps workers that failed together from retrying together
+        backoff = min(config.max_backoff, config.backoff_factor * 2**attempt)
+        backoff += random.uniform(0, 1)
+        is_last_attempt = attempt == config.max_retries
+        if rate_limiter is not None:
+            await rate_limiter.acquire(estimated_tokens)
+        try:
+            async with semaphore:
+                async with session.post(
+                    config.url,
+                    data=body,
+                    timeout=aiohttp.ClientTimeout(
+                        total=config.read_timeout, connect=config.connect_timeout
+                    ),
+                ) as response:
+                    if response.status in RETRY_STATUSES and not is_last_attempt:
+                        delay = get_retry_delay(response, backoff)
+                        reason = f"HTTP {response.status}"
+                    else:
+                        response.raise_for_status()
+                        return await response.read()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if is_last_attempt:
+                raise
+            delay = backoff
+            reason = str(e) or type(e).__name__
+
+        logger.warning(
+            "⏳ DeepSeek request failed (%s), retrying in %.1fs", reason, delay
+        )
+        await asyncio.sleep(delay)
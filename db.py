@@ -0,0 +1,47 @@
+# Shared MongoDB client for the pipeline scripts.
+# Scripts run in one process reuse its connection pool instead of each
+# opening their own.
+
+from dotenv import load_dotenv
+import atexit
+import os
+from functools import lru_cache
+from pymongo import MongoClient
+
+load_dotenv()
+
+# Wire compression offered to the server, in preference order. zlib ships with
+# Python, so it covers servers or installs without zstd support.
+COMPRESSORS = "zstd,zlib"
+ZLIB_COMPRESSION_LEVEL = 6
+
+# Political stances tallied in each cluster's coverage
+STANCES = ("left", "center-left", "center", "center-right", "right")
+
+
+@lru_cache(maxsize=1)
+def get_client() -> MongoClient:
+    """Return the process-wide MongoDB client, connecting to MONGODB_URI on first use."""
+    # Keep a warm pool for the bulk writes and compress article payloads on
+    # the wire
+    return MongoClient(
+        os.getenv("MONGODB_URI"),
+        maxPoolSize=200,
+        minPoolSize=10,
+        maxIdleTimeMS=300_000,
+        serverSelectionTimeoutMS=5000,
+        retryWrites=True,
+        compressors=COMPRESSORS,
+        zlibCompressionLevel=ZLIB_COMPRESSION_LEVEL,
+    )
+
+
+def close_client() -> None:
+    """Close the shared client, if it was opened; get_client then opens a new one."""
+    if get_client.cache_info().currsize:
+        get_client().close()
+        get_client.cache_clear()
+
+
+# Closed once when the process exits, so every stage run in it shares the pool
+atexit.register(close_client)
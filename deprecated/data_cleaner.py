@@ -6,19 +6,58 @@
 from dotenv import load_dotenv
 import os
 import json
+import hashlib
+import orjson
 import time
+import re
+import unicodedata
+import logging
 from datetime import datetime
-from typing import Union, Dict, Any, List, Optional
+from typing import Union, AsyncIterator, Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, OperationFailure
+from functools import cached_property, lru_cache
+from html.parser import HTMLParser
+from pymongo import AsyncMongoClient, UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+from pymongo.write_concern import WriteConcern
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
 import asyncio
 import aiohttp
+from common import create_api_session, post_with_retries, setup_logging
+from db import COMPRESSORS, ZLIB_COMPRESSION_LEVEL
+from deprecated.load_data import (
+    UNCLEANED_INDEX,
+    UNCLEANED_QUERY,
+    serialize_article,
+)
+
+try:
+    import uvloop
+except ImportError:  # Not available on Windows
+    uvloop = None
 
 load_dotenv()
 
+logger = logging.getLogger("data_cleaner")
+
+CLEAN_SYSTEM_PROMPT = """You are a helpful assistant that cleans and processes article data. You must always provide complete responses without truncation.
+Clean and process each article according to these instructions:
+1. Remove all HTML tags from the content and any other fields
+2. Clean any special characters or formatting
+3. Ensure all text is properly encoded in UTF-8
+4. Keep the original structure but with cleaned content
+5. Return ONLY the cleaned article in JSON format"""
+CLEAN_SYSTEM_MESSAGE = {"role": "system", "content": CLEAN_SYSTEM_PROMPT}
+
+# String fields at least this long are stripped of HTML before the API call
+PRE_CLEAN_MIN_LENGTH = 200
+CONTROL_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+
+# Cached cleaned articles expire after 30 days
+CLEAN_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+
 
 @dataclass
 class APIConfig:
@@ -34,7 +73,53 @@ class APIConfig:
     frequency_penalty: float = 0.1
     connect_timeout: int = 10
     read_timeout: int = 300
-    chunk_size: int = 8192
+    max_retries: int = 5
+    backoff_factor: float = 1.0
+    max_backoff: float = 30.0
+
+    @cached_property
+    def payload_template(self) -> Dict[str, Any]:
+        """Request fields shared by every cleaning call, built once per run."""
+        return {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "top_p": self.top_p,
+            "presence_penalty": self.presence_penalty,
+            "frequency_penalty": self.frequency_penalty,
+            "response_format": {"type": "json_object"},
+        }
+
+
+@dataclass
+class CleanStats:
+    """Running totals for a clean_data run."""
+
+    saved: int = 0
+    updated: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+class TextExtractor(HTMLParser):
+    """Collect the text of an HTML fragment, skipping script and style blocks."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        if tag in ("script", "style"):
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in ("script", "style") and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data: str) -> None:
+        if not self.skip_depth:
+            self.parts.append(data)
 
 
 class APIError(Exception):
@@ -55,21 +140,7 @@ class ResponseError(APIError):
     pass
 
 
-def get_timestamp() -> str:
-    """Get current timestamp in a consistent format."""
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-
-def print_step(message: str, start_time: Optional[float] = None) -> None:
-    """Print a step message with optional elapsed time."""
-    timestamp = get_timestamp()
-    if start_time:
-        elapsed = time.time() - start_time
-        print(f"[{timestamp}] {message} (Elapsed: {elapsed:.2f}s)")
-    else:
-        print(f"[{timestamp}] {message}")
-
-
+@lru_cache(maxsize=1)
 def get_api_config() -> APIConfig:
     """Get API configuration from environment variables."""
     api_url = os.getenv("DEEPSEEK_API_URL")
@@ -81,38 +152,160 @@ def get_api_config() -> APIConfig:
     return APIConfig(url=str(api_url), key=str(api_key))
 
 
+async def connect_mongo(mongo_uri: str) -> AsyncMongoClient:
+    """Create a MongoDB client and ping it, so a bad URI fails before any work."""
+    client = AsyncMongoClient(
+        mongo_uri,
+        maxPoolSize=50,
+        compressors=COMPRESSORS,
+        zlibCompressionLevel=ZLIB_COMPRESSION_LEVEL,
+    )
+    try:
+        await client.admin.command("ping")
+    except ConnectionFailure:
+        await client.close()
+        raise
+    return client
+
+
+def pre_clean(article: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip HTML, control characters and repeated whitespace from long text fields.
+
+    Done locally so DeepSeek is not billed for markup it would remove anyway.
+    """
+    cleaned = {}
+    for key, value in article.items():
+        if isinstance(value, str) and len(value) >= PRE_CLEAN_MIN_LENGTH:
+            if "<" in value:
+                extractor = TextExtractor()
+                extractor.feed(value)
+                extractor.close()
+                value = " ".join(extractor.parts)
+            value = unicodedata.normalize("NFKC", CONTROL_CHARS.sub(" ", value))
+            value = " ".join(value.split())
+        cleaned[key] = value
+    return cleaned
+
+
 def prepare_clean_payload(article: Dict[str, Any], config: APIConfig) -> Dict[str, Any]:
     """Prepare the API request payload for cleaning a single article."""
     return {
-        "model": config.model,
+        **config.payload_template,
         "messages": [
-            {
-                "role": "system",
-                "content": "You are a helpful assistant that cleans and processes article data. You must always provide complete responses without truncation.",
-            },
+            CLEAN_SYSTEM_MESSAGE,
             {
                 "role": "user",
-                "content": f"""
-                Please clean and process the following article according to these instructions:
-
-                1. Remove all HTML tags from the content and any other fields
-                2. Clean any special characters or formatting
-                3. Ensure all text is properly encoded in UTF-8
-                4. Keep the original structure but with cleaned content
-                5. Return ONLY the cleaned article in JSON format
-
-                Article to clean:
-                {json.dumps(article, ensure_ascii=False)}
-                """,
+                "content": f"Article to clean:\n{orjson.dumps(article, default=str).decode()}",
             },
         ],
+    }
+
+
+def clean_cache_key(article: Dict[str, Any], config: APIConfig) -> str:
+    """Hash the article content and model settings that determine its cleaned copy."""
+    content = {
+        key: value for key, value in article.items() if key not in ("_id", "cleaned")
+    }
+    cache_input = {
+        "model": config.model,
         "temperature": config.temperature,
-        "max_tokens": config.max_tokens,
-        "top_p": config.top_p,
-        "presence_penalty": config.presence_penalty,
-        "frequency_penalty": config.frequency_penalty,
-        "response_format": {"type": "json_object"},
+        "article": content,
     }
+    return hashlib.sha256(
+        orjson.dumps(cache_input, default=str, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+async def load_cached_cleans(
+    cache_collection: AsyncCollection, cache_keys: List[str]
+) -> Dict[str, Dict[str, Any]]:
+    """Return the cached cleaned articles for the given cache keys."""
+    try:
+        return {
+            entry["_id"]: entry["cleaned_article"]
+            async for entry in cache_collection.find({"_id": {"$in": cache_keys}})
+        }
+    except PyMongoError as e:
+        logger.warning("⚠️ Could not read clean cache: %s", e)
+        return {}
+
+
+async def save_cached_cleans(
+    cache_collection: AsyncCollection, cleaned_by_key: Dict[str, Dict[str, Any]]
+) -> None:
+    """Store freshly cleaned articles in the cache and clear the buffer."""
+    if not cleaned_by_key:
+        return
+
+    now = datetime.now()
+    operations = [
+        UpdateOne(
+            {"_id": cache_key},
+            {"$setOnInsert": {"cleaned_article": cleaned, "created_at": now}},
+            upsert=True,
+        )
+        for cache_key, cleaned in cleaned_by_key.items()
+    ]
+    cleaned_by_key.clear()
+    try:
+        await cache_collection.bulk_write(operations, ordered=False)
+    except PyMongoError as e:
+        logger.warning("⚠️ Could not write clean cache: %s", e)
+
+
+async def iterate_articles(
+    data: Optional[List[Dict[str, Any]]],
+    original_collection: AsyncCollection,
+    batch_size: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the given articles, or stream the uncleaned ones from MongoDB.
+
+    Articles are consumed at DeepSeek's pace, so the cursor fetches
+    `batch_size` at a time. A default 16MB batch could take long enough to
+    work through that the server times out the idle cursor. Whole documents
+    are read, since the cleaned copy keeps every field of the original.
+    """
+    if data is not None:
+        for article in data:
+            yield article
+        return
+
+    async for doc in (
+        original_collection.find(UNCLEANED_QUERY)
+        .sort("date", -1)
+        .batch_size(batch_size)
+    ):
+        yield serialize_article(doc)
+
+
+async def load_uncleaned_ids(
+    original_collection: AsyncCollection, article_ids: List[str]
+) -> set:
+    """Return which of the given article ids are not yet flagged as cleaned.
+
+    Pre-loaded article lists can be stale (another run may have cleaned some
+    of them since), so their flags are re-checked in one indexed query.
+    """
+    object_ids = []
+    unchecked_ids = set()
+    for article_id in article_ids:
+        try:
+            object_ids.append(ObjectId(article_id))
+        except (InvalidId, TypeError):
+            # Left in; flush_clean_writes reports the invalid id
+            unchecked_ids.add(article_id)
+
+    try:
+        uncleaned_ids = {
+            str(doc["_id"])
+            async for doc in original_collection.find(
+                {"_id": {"$in": object_ids}, **UNCLEANED_QUERY}, {"_id": 1}
+            )
+        }
+    except PyMongoError as e:
+        logger.warning("⚠️ Could not check cleaned flags: %s", e)
+        return set(article_ids)
+    return uncleaned_ids | unchecked_ids
 
 
 async def clean_article(
@@ -122,99 +315,161 @@ async def clean_article(
     semaphore: asyncio.Semaphore,
     article_index: int,
     total_articles: int,
-) -> Dict[str, Any]:
-    """Clean a single article using DeepSeek AI."""
+) -> Optional[Dict[str, Any]]:
+    """Clean a single article using DeepSeek AI, or return None if it fails."""
     try:
-        await semaphore.acquire()
-        print_step(
-            f"💭 {article_index}/{total_articles}\tID: {article.get('_id', 'N/A')}"
-        )
-
         # Store the original ID before cleaning
         original_id = article.get("_id")
 
         payload = prepare_clean_payload(article, config)
-        headers = {
-            "Authorization": f"Bearer {config.key}",
-            "Content-Type": "application/json",
-        }
 
-        async with session.post(
-            config.url,
-            json=payload,
-            headers=headers,
-            timeout=aiohttp.ClientTimeout(total=config.read_timeout),
-        ) as response:
-            response.raise_for_status()
-            response_data = await response.json()
-
-            # Extract the cleaned article from the first choice's message content
-            if "choices" in response_data and len(response_data["choices"]) > 0:
-                cleaned_content = response_data["choices"][0]["message"]["content"]
-                cleaned_article = json.loads(cleaned_content)
-
-                # Add original_article_id field instead of overwriting _id
-                cleaned_article["original_article_id"] = original_id
-                # Remove _id if it exists in the cleaned content to let MongoDB generate a new one
-                cleaned_article.pop("_id", None)
-
-                print_step(
-                    f"🧹 {article_index}/{total_articles}\tID: {article.get('_id', 'N/A')}"
-                )
-                return cleaned_article
-            else:
-                error_msg = f"API Response missing choices. Response: {json.dumps(response_data, indent=2)}"
-                print_step(f"🔴 Error in article {article_index}: {error_msg}")
-                raise ResponseError(error_msg)
-
-    except aiohttp.ClientError as e:
-        error_msg = f"Network error while cleaning article {article_index}: {str(e)}"
-        print_step(f"🔴 {error_msg}")
-        print_step(
-            f"🔴 Article content that caused the error: {json.dumps(article, indent=2)}"
+        logger.info(
+            "💭 %s/%s\tID: %s", article_index, total_articles, article.get("_id", "N/A")
         )
-        return article
-    except json.JSONDecodeError as e:
-        error_msg = f"JSON parsing error in article {article_index}: {str(e)}"
-        print_step(f"🔴 {error_msg}")
-        print_step(
-            f"🔴 Article content that caused the error: {json.dumps(article, indent=2, ensure_ascii=False)}"
+        # Only the HTTP exchange holds a slot; parsing happens after release
+        response_body = await post_with_retries(
+            session, orjson.dumps(payload), config, semaphore
         )
-        return article
-    except ResponseError as e:
-        error_msg = f"API response error in article {article_index}: {str(e)}"
-        print_step(f"🔴 {error_msg}")
-        print_step(
-            f"🔴 Article content that caused the error: {json.dumps(article, indent=2, ensure_ascii=False)}"
+
+        response_data = orjson.loads(response_body)
+
+        # Extract the cleaned article from the first choice's message content
+        if "choices" in response_data and len(response_data["choices"]) > 0:
+            cleaned_content = response_data["choices"][0]["message"]["content"]
+            cleaned_article = orjson.loads(cleaned_content)
+
+            # Add original_article_id field instead of overwriting _id
+            cleaned_article["original_article_id"] = original_id
+            # Remove _id if it exists in the cleaned content to let MongoDB generate a new one
+            cleaned_article.pop("_id", None)
+
+            logger.info(
+                "🧹 %s/%s\tID: %s",
+                article_index,
+                total_articles,
+                article.get("_id", "N/A"),
+            )
+            return cleaned_article
+        else:
+            # Log the bytes already read rather than re-encoding the parsed envelope
+            error_msg = f"API Response missing choices. Response: {response_body.decode(errors='replace')}"
+            raise ResponseError(error_msg)
+
+    except (aiohttp.ClientError, json.JSONDecodeError, ResponseError) as e:
+        logger.error(
+            "🔴 Error cleaning article %s (ID: %s): %s",
+            article_index,
+            article.get("_id", "N/A"),
+            e,
         )
-        return article
+        logger.debug("Article that caused the error: %s", article)
+        return None
     except Exception as e:
-        error_msg = f"Unexpected error cleaning article {article_index}: {str(e)}"
-        print_step(f"🔴 {error_msg}")
-        print_step(f"🔴 Error type: {type(e).__name__}")
-        print_step(
-            f"🔴 Article content that caused the error: {json.dumps(article, indent=2, ensure_ascii=False)}"
+        logger.error(
+            "🔴 Unexpected %s cleaning article %s (ID: %s): %s",
+            type(e).__name__,
+            article_index,
+            article.get("_id", "N/A"),
+            e,
         )
-        return article
-    finally:
-        semaphore.release()
+        logger.debug("Article that caused the error: %s", article)
+        return None
+
+
+async def flush_clean_writes(
+    pending: List[Tuple[int, str, Dict[str, Any]]],
+    clean_collection: AsyncCollection,
+    original_collection: AsyncCollection,
+) -> Tuple[int, int, int]:
+    """Insert buffered cleaned articles and flag their originals as cleaned.
+
+    `pending` holds `(article_index, original_id, cleaned_article)` tuples.
+    Originals are only flagged once their cleaned copy was inserted. The
+    buffer is cleared. Returns the number of articles saved, originals updated
+    and articles failed.
+    """
+    batch = list(pending)
+    pending.clear()
+    if not batch:
+        return 0, 0, 0
+
+    failed_positions = set()
+    try:
+        await clean_collection.insert_many(
+            [cleaned_article for _, _, cleaned_article in batch], ordered=False
+        )
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed_positions.add(error["index"])
+            logger.error(
+                "🔴 Error saving article %s: %s",
+                batch[error["index"]][0],
+                error.get("errmsg"),
+            )
+    except PyMongoError as e:
+        logger.error("🔴 Error saving %s articles: %s", len(batch), e)
+        return 0, 0, len(batch)
+
+    saved = [
+        item for position, item in enumerate(batch) if position not in failed_positions
+    ]
+    update_indexes = []
+    update_ops = []
+    for i, original_id, _ in saved:
+        try:
+            update_ops.append(
+                UpdateOne({"_id": ObjectId(original_id)}, {"$set": {"cleaned": True}})
+            )
+            update_indexes.append(i)
+        except InvalidId:
+            logger.error("🔴 Invalid ID format for article %s", i)
+
+    updated = 0
+    if update_ops:
+        try:
+            result = await original_collection.bulk_write(update_ops, ordered=False)
+            updated = result.modified_count
+        except BulkWriteError as e:
+            updated = e.details.get("nModified", 0)
+            for error in e.details.get("writeErrors", []):
+                logger.error(
+                    "🔴 Error updating article %s: %s",
+                    update_indexes[error["index"]],
+                    error.get("errmsg"),
+                )
+        except PyMongoError as e:
+            logger.error(
+                "🔴 Error updating %s original articles: %s", len(update_ops), e
+            )
+
+    logger.info("💾 Saved %s articles and updated %s originals", len(saved), updated)
+    return len(saved), updated, len(failed_positions)
 
 
-async def clean_data(data: Union[str, List[Dict[str, Any]]]) -> None:
-    """Clean all articles in the input data, save them to MongoDB, and update original articles."""
+async def clean_data(
+    data: Optional[Union[str, List[Dict[str, Any]]]] = None,
+    client: Optional[AsyncMongoClient] = None,
+) -> None:
+    """Clean all articles in the input data, save them to MongoDB, and update original articles.
+
+    Without input data, uncleaned articles are streamed from the original
+    collection. Pass an open `client` to reuse its pooled connections across
+    calls made in the same event loop; otherwise one is opened for this call
+    and closed when it returns.
+    """
     start_time = time.time()
-    print_step("Starting data cleaning, saving, and updating process")
+    logger.info("Starting data cleaning, saving, and updating process")
 
-    client = None
+    owned_client: Optional[AsyncMongoClient] = None
     try:
         # Convert string data to JSON if needed
         if isinstance(data, str):
             try:
-                data = json.loads(data)
+                data = orjson.loads(data)
             except json.JSONDecodeError as e:
                 raise ResponseError(f"Invalid JSON data: {str(e)}")
 
-        if not isinstance(data, list):
+        if data is not None and not isinstance(data, list):
             raise ResponseError("Input data must be a list of articles")
 
         config = get_api_config()
@@ -224,6 +479,7 @@ async def clean_data(data: Union[str, List[Dict[str, Any]]]) -> None:
         mongo_db_name = os.getenv("MONGODB_DB")
         mongo_original_col_name = os.getenv("MONGODB_COL")
         mongo_clean_col_name = "clean_articles"
+        mongo_cache_col_name = "clean_cache"
 
         if not all([mongo_uri, mongo_db_name, mongo_original_col_name]):
             raise ConfigurationError(
@@ -231,128 +487,196 @@ async def clean_data(data: Union[str, List[Dict[str, Any]]]) -> None:
             )
 
         try:
-            client = MongoClient(mongo_uri)
+            if client is None:
+                client = owned_client = await connect_mongo(str(mongo_uri))
             db = client[str(mongo_db_name)]
-            original_collection = db[str(mongo_original_col_name)]
-            clean_collection = db[mongo_clean_col_name]
-            # Test connection
-            client.admin.command("ping")
-            print_step(f"Successfully connected to MongoDB database '{mongo_db_name}'.")
-            print_step(
-                f"Using original collection: '{mongo_original_col_name}' and clean collection: '{mongo_clean_col_name}'"
+            # Both writes can be redone on a rerun (originals are only flagged
+            # after their cleaned copy is saved), so an unjournaled primary ack
+            # is enough
+            write_concern = WriteConcern(w=1, j=False)
+            original_collection = db.get_collection(
+                str(mongo_original_col_name), write_concern=write_concern
+            )
+            clean_collection = db.get_collection(
+                mongo_clean_col_name, write_concern=write_concern
+            )
+            cache_collection = db.get_collection(
+                mongo_cache_col_name, write_concern=write_concern
+            )
+            logger.info(
+                "Successfully connected to MongoDB database '%s'.", mongo_db_name
+            )
+            logger.info(
+                "Using original collection: '%s' and clean collection: '%s'",
+                mongo_original_col_name,
+                mongo_clean_col_name,
             )
         except ConnectionFailure as e:
             raise ConfigurationError(f"Could not connect to MongoDB: {e}")
         # --- End MongoDB Connection ---
 
-        articles_saved_count = 0
-        articles_updated_count = 0
-        articles_failed_count = 0
-        skipped_count = 0  # Counter for skipped articles
+        # Expire cached cleaned articles so the cache does not grow forever
+        await cache_collection.create_index(
+            "created_at", expireAfterSeconds=CLEAN_CACHE_TTL_SECONDS
+        )
+        # Serves the uncleaned-articles query here and in load_data, which
+        # only reads
+        await original_collection.create_index(UNCLEANED_INDEX)
+
+        stats = CleanStats()
+
+        # Cleaned articles are buffered and written in bulk once this many
+        # are pending
+        write_batch_size = int(os.getenv("CLEAN_WRITE_BATCH_SIZE", "200"))
+        pending_writes: List[Tuple[int, str, Dict[str, Any]]] = []
+        # Freshly cleaned articles to add to the cache on the next flush
+        pending_cache_entries: Dict[str, Dict[str, Any]] = {}
 
         # Create a semaphore to limit concurrent requests
-        max_concurrent_tasks = 5
+        max_concurrent_tasks = int(os.getenv("CLEAN_CONCURRENCY", "32"))
         semaphore = asyncio.Semaphore(max_concurrent_tasks)
-
-        async with aiohttp.ClientSession() as session:  # Use aiohttp session
+        # Twice as many workers as request slots, so responses are parsed and
+        # buffered while other workers hold the slots
+        worker_count = 2 * max_concurrent_tasks
+        # Bounded so reading from MongoDB never runs far ahead of the API
+        # Items are (index, article, original id, cache key); None stops a worker
+        article_queue: asyncio.Queue = asyncio.Queue(maxsize=worker_count)
+
+        if data is None:
+            total_articles = await original_collection.count_documents(UNCLEANED_QUERY)
+        else:
             total_articles = len(data)
-            tasks = []  # List to hold tasks
-            for i, article in enumerate(data, 1):
+
+        async def flush_writes() -> None:
+            # The cache write is independent of the article writes, so its
+            # round trip overlaps theirs. The originals' update must still wait
+            # for the insert, since only saved articles may be flagged
+            _, (saved, updated, failed) = await asyncio.gather(
+                save_cached_cleans(cache_collection, pending_cache_entries),
+                flush_clean_writes(
+                    pending_writes, clean_collection, original_collection
+                ),
+            )
+            stats.saved += saved
+            stats.updated += updated
+            stats.failed += failed
+
+        async def dispatch(chunk: List[Tuple[int, Dict[str, Any], str]]) -> None:
+            if data is not None:
+                uncleaned_ids = await load_uncleaned_ids(
+                    original_collection, [original_id for _, _, original_id in chunk]
+                )
+                stats.skipped += len(chunk)
+                chunk = [item for item in chunk if item[2] in uncleaned_ids]
+                stats.skipped -= len(chunk)
+
+            # Reuse cached cleaned copies and only queue the rest for DeepSeek
+            cache_keys = {
+                original_id: clean_cache_key(article, config)
+                for _, article, original_id in chunk
+            }
+            cached_cleans = await load_cached_cleans(
+                cache_collection, list(set(cache_keys.values()))
+            )
+            reused = 0
+            for i, article, original_id in chunk:
+                cached = cached_cleans.get(cache_keys[original_id])
+                if cached is None:
+                    await article_queue.put(
+                        (i, article, original_id, cache_keys[original_id])
+                    )
+                    continue
+                pending_writes.append(
+                    (i, original_id, {**cached, "original_article_id": original_id})
+                )
+                reused += 1
+
+            if reused:
+                logger.info("♻️ Reusing %s cached cleaned articles", reused)
+            if len(pending_writes) >= write_batch_size:
+                await flush_writes()
+
+        async def produce() -> None:
+            try:
+                await queue_articles()
+            finally:
+                # One sentinel per worker, even if reading articles failed
+                for _ in range(worker_count):
+                    await article_queue.put(None)
+
+            # Print total skipped articles after the loop
+            if stats.skipped > 0:
+                logger.info(
+                    "🏳️Skipped %s articles due to already being cleaned.", stats.skipped
+                )
+
+        async def queue_articles() -> None:
+            chunk: List[Tuple[int, Dict[str, Any], str]] = []
+            i = 0
+            # One getMore per dispatched chunk
+            async for article in iterate_articles(
+                data, original_collection, worker_count
+            ):
+                i += 1
                 # --- Check if already cleaned --- # Added check
                 if article.get("cleaned") is True:
-                    skipped_count += 1
+                    stats.skipped += 1
                     continue  # Skip to the next article
                 # --- End Check ---
 
-                original_article = article  # Keep reference to original article data
-                original_article_id_str = original_article.get(
-                    "_id"
-                )  # Get the string ID
+                original_article_id_str = article.get("_id")  # Get the string ID
 
                 if not original_article_id_str:
-                    print_step(f"  🏁Skipping article {i} due to missing '_id'.")
-                    articles_failed_count += 1
+                    logger.info("  🏁Skipping article %s due to missing '_id'.", i)
+                    stats.failed += 1
                     continue
 
-                # Create a task for cleaning the article
-                task = asyncio.create_task(
-                    clean_article(
-                        article,
-                        config,
-                        session,
-                        semaphore,
-                        i,
-                        total_articles,
-                    )
-                )
-                tasks.append(
-                    (i, original_article, original_article_id_str, task)
-                )  # Store task and metadata
+                chunk.append((i, pre_clean(article), original_article_id_str))
+                if len(chunk) >= worker_count:
+                    await dispatch(chunk)
+                    chunk = []
 
-            # Print total skipped articles after the loop
-            if skipped_count > 0:
-                print_step(
-                    f"🏳️Skipped {skipped_count} articles due to already being cleaned."
-                )
+            if chunk:
+                await dispatch(chunk)
 
-            # Wait for all tasks to complete
-            for i, original_article, original_article_id_str, task in tasks:
+        async def consume(session: aiohttp.ClientSession) -> None:
+            while (item := await article_queue.get()) is not None:
+                i, article, original_id, cache_key = item
                 try:
-                    cleaned_article = await task  # Await the task result
-
-                    save_successful = False
-                    try:
-                        # 1. Insert the cleaned article into the target collection
-                        insert_result = clean_collection.insert_one(cleaned_article)
-                        articles_saved_count += 1
-                        save_successful = True
-                        print_step(
-                            f"💾 {i}/{total_articles}\tID: {insert_result.inserted_id}"
-                        )
-
-                        # 2. Update the original article ONLY if save was successful
-                        try:
-                            original_object_id = ObjectId(original_article_id_str)
-                            update_result = original_collection.update_one(
-                                {"_id": original_object_id},
-                                {"$set": {"cleaned": True}},
-                            )
-                            if update_result.matched_count > 0:
-                                if update_result.modified_count > 0:
-                                    print_step(
-                                        f"🟢 {i}/{total_articles}\tID: {original_object_id}"
-                                    )
-                                    articles_updated_count += 1
-                                else:
-                                    print_step(
-                                        f"🏳️ {i}/{total_articles}\tID: {original_object_id}"
-                                    )
-                            else:
-                                print_step(
-                                    f"🚨 Article {i} not found in '{mongo_original_col_name}'"
-                                )
-
-                        except InvalidId:
-                            print_step(f"🔴 Invalid ID format for article {i}")
-                        except OperationFailure as e:
-                            print_step(f"🔴 Error updating article {i}: {e}")
-                        except Exception as e:
-                            print_step(f"🔴 Unexpected error updating article {i}: {e}")
-
-                    except OperationFailure as e:
-                        print_step(f"🔴 Error saving article {i}: {e}")
-                        articles_failed_count += 1
-                    except Exception as e:
-                        print_step(f"🔴 Unexpected error saving article {i}: {e}")
-                        articles_failed_count += 1
-
+                    cleaned_article = await clean_article(
+                        article, config, session, semaphore, i, total_articles
+                    )
                 except Exception as e:
-                    print_step(f"🔴 Error processing article {i}: {e}")
-                    articles_failed_count += 1
+                    logger.error("🔴 Error processing article %s: %s", i, e)
+                    stats.failed += 1
+                    continue
 
-        print_step(
-            f"Finished processing. ✅Saved: {articles_saved_count}, ✅Updated Original: {articles_updated_count}, ❌Failed/Skipped: {articles_failed_count}",
-            start_time,
+                # Failed articles stay unflagged so the next run retries them
+                if cleaned_article is None:
+                    stats.failed += 1
+                    continue
+
+                pending_writes.append((i, original_id, cleaned_article))
+                pending_cache_entries[cache_key] = {
+                    key: value
+                    for key, value in cleaned_article.items()
+                    if key not in ("_id", "original_article_id")
+                }
+                if len(pending_writes) >= write_batch_size:
+                    await flush_writes()
+
+        async with create_api_session(config, max_concurrent_tasks) as session:
+            await asyncio.gather(
+                produce(), *[consume(session) for _ in range(worker_count)]
+            )
+        await flush_writes()
+
+        logger.info(
+            "Finished processing. ✅Saved: %s, ✅Updated Original: %s, ❌Failed/Skipped: %s (Elapsed: %.2fs)",
+            stats.saved,
+            stats.updated,
+            stats.failed,
+            time.time() - start_time,
         )
 
     except ConfigurationError as e:
@@ -360,25 +684,26 @@ async def clean_data(data: Union[str, List[Dict[str, Any]]]) -> None:
     except Exception as e:
         raise APIError(f"Error during data cleaning/saving/updating process: {str(e)}")
     finally:
-        # Ensure MongoDB client is closed if it was initialized
-        if client:
-            client.close()
-            print_step("MongoDB connection closed.")
+        # Only close the client if this call opened it
+        if owned_client is not None:
+            await owned_client.close()
+            logger.info("MongoDB connection closed.")
 
 
 if __name__ == "__main__":
+    log_listener = setup_logging()
     try:
-        from deprecated.load_data import load_data
+        # uvloop's libuv event loop dispatches HTTP and Mongo callbacks faster
+        if uvloop is not None:
+            uvloop.run(clean_data())
+        else:
+            asyncio.run(clean_data())
 
-        print_step("Loading data...")
-        data_json_string = load_data()
-        print_step("Data loaded.")
-
-        asyncio.run(clean_data(data_json_string))
-
-        print_step(
+        logger.info(
             "Data cleaning, saving, and updating process initiated successfully."
         )
 
     except Exception as e:
-        print_step(f"An error occurred in the main execution block: {str(e)}")
+        logger.error("An error occurred in the main execution block: %s", e)
+    finally:
+        log_listener.stop()
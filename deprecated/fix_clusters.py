@@ -1,46 +1,68 @@
+import logging
 import pymongo
-from pymongo import MongoClient
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
 from dotenv import load_dotenv
-import os
 import time
-from datetime import datetime
+from itertools import islice
+from common import setup_logging
+from db import STANCES, get_client
 
 # Load environment variables
 load_dotenv()
 
-
-def get_timestamp():
-    """Get current timestamp in a consistent format."""
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-
-def print_step(message, start_time=None):
-    """Print a step message with optional elapsed time."""
-    timestamp = get_timestamp()
-    if start_time:
-        elapsed = time.time() - start_time
-        print(f"[{timestamp}] {message} (Elapsed: {elapsed:.2f}s)")
-    else:
-        print(f"[{timestamp}] {message}")
-
-
-def get_coverage(article_ids, articles_collection):
+logger = logging.getLogger("fix_clusters")
+
+# Clusters should_skip_cluster would not skip: 3+ articles and a coverage
+# total that differs from the article count
+NEEDS_COVERAGE_QUERY = {
+    "articles_count": {"$gte": 3},
+    "$expr": {
+        "$ne": [
+            "$articles_count",
+            {"$add": [f"$coverage.{stance}" for stance in STANCES]},
+        ]
+    },
+}
+
+# Cluster fields read by the per-cluster fallback
+CLUSTER_PROJECTION = {"_id": 1, "name": 1, "articles": 1, "coverage": 1}
+
+# Clusters read and coverage updates sent per bulk_write in the per-cluster
+# fallback, and article ids per stance lookup query
+WRITE_BATCH_SIZE = 500
+STANCE_LOOKUP_BATCH_SIZE = 50_000
+
+
+def load_stances(clusters, articles):
+    """Map each article in a cluster needing coverage to its political orientation.
+
+    Articles shared by several clusters are fetched only once.
+    """
+    article_ids = set()
+    for cluster in clusters.find(NEEDS_COVERAGE_QUERY, {"_id": 0, "articles": 1}):
+        article_ids.update(cluster["articles"])
+
+    stances = {}
+    ids = iter(article_ids)
+    # Chunked so each $in list stays well under the 16MB command limit
+    while chunk := list(islice(ids, STANCE_LOOKUP_BATCH_SIZE)):
+        for article in articles.find(
+            {"_id": {"$in": chunk}}, {"political_orientation": 1}
+        ):
+            stances[article["_id"]] = article.get("political_orientation")
+    return stances
+
+
+def get_coverage(article_ids, stances):
     """Calculate coverage statistics for a list of article IDs."""
-    coverage = {"left": 0, "center-left": 0, "center": 0, "center-right": 0, "right": 0}
-
-    for article_id in article_ids:
-        article = articles_collection.find_one({"_id": article_id})
-        if article and "political_orientation" in article:
-            stance = article["political_orientation"]
-            if stance in coverage:
-                coverage[stance] += 1
-                # print(f"\t\t✅ Found political stance: {stance}")
-            else:
-                # print(f"\t\t⚠️ Unknown political stance: {stance}")
-                pass
-        else:
-            # print(f"\t\t❌ No political orientation found for article {article_id}")
-            pass
+    coverage = dict.fromkeys(STANCES, 0)
+
+    # Each article counts once, even if a cluster lists it twice
+    for article_id in set(article_ids):
+        stance = stances.get(article_id)
+        if stance in coverage:
+            coverage[stance] += 1
 
     return coverage
 
@@ -73,10 +95,136 @@ def should_skip_cluster(cluster):
     return False, "Coverage needs updating"
 
 
+def update_coverage_server_side(clusters, articles):
+    """Recompute coverage for clusters that need it in a single aggregation.
+
+    The stances are looked up, tallied and merged back into the clusters on
+    the server. The $lookup sub-pipeline needs MongoDB 5.0+; older servers
+    raise OperationFailure. Returns the number of clusters recomputed.
+    """
+    updated = clusters.count_documents(NEEDS_COVERAGE_QUERY)
+    clusters.aggregate(
+        [
+            {"$match": NEEDS_COVERAGE_QUERY},
+            {
+                "$lookup": {
+                    "from": articles.name,
+                    "localField": "articles",
+                    "foreignField": "_id",
+                    "pipeline": [{"$project": {"_id": 0, "political_orientation": 1}}],
+                    "as": "stances",
+                }
+            },
+            {
+                "$project": {
+                    "coverage": {
+                        stance: {
+                            "$size": {
+                                "$filter": {
+                                    "input": "$stances",
+                                    "cond": {
+                                        "$eq": ["$$this.political_orientation", stance]
+                                    },
+                                }
+                            }
+                        }
+                        for stance in STANCES
+                    }
+                }
+            },
+            {
+                "$merge": {
+                    "into": clusters.name,
+                    "on": "_id",
+                    "whenMatched": "merge",
+                    "whenNotMatched": "discard",
+                }
+            },
+        ]
+    )
+    return updated
+
+
+def update_coverage_client_side(clusters, articles, total_clusters):
+    """Recompute coverage cluster by cluster, for servers without aggregation support.
+
+    The stances of all articles involved are loaded up front, so coverage is
+    tallied in memory, and each batch of clusters is written with one
+    bulk_write.
+    """
+    # Clusters left out by the query are the ones that would be skipped
+    skipped = total_clusters - clusters.count_documents(NEEDS_COVERAGE_QUERY)
+    processed = skipped
+    start_time = time.time()
+
+    logger.info("🔎 Loading article stances...")
+    stances = load_stances(clusters, articles)
+    logger.info("✅ Loaded stances for %s articles", len(stances))
+
+    logger.info("🔄 Processing clusters and computing coverage...")
+    cursor = (
+        clusters.find(NEEDS_COVERAGE_QUERY, CLUSTER_PROJECTION)
+        .sort("articles_count", -1)
+        .batch_size(WRITE_BATCH_SIZE)
+    )
+    while batch := list(islice(cursor, WRITE_BATCH_SIZE)):
+        to_update = []
+        for cluster in batch:
+            processed += 1
+            logger.debug(
+                "📦 Processing cluster %s/%s: %s",
+                processed,
+                total_clusters,
+                cluster.get("name", "Unnamed"),
+            )
+
+            # Defensive: the query should already have left this cluster out
+            skip, reason = should_skip_cluster(cluster)
+            if skip:
+                logger.debug("⏩ Skipping cluster - %s", reason)
+                skipped += 1
+                continue
+            to_update.append(cluster)
+
+        updates = []
+        for cluster in to_update:
+            coverage = get_coverage(cluster["articles"], stances)
+            logger.debug(
+                "📊 Coverage for %s: %s", cluster.get("name", "Unnamed"), coverage
+            )
+            updates.append(
+                UpdateOne({"_id": cluster["_id"]}, {"$set": {"coverage": coverage}})
+            )
+        if updates:
+            clusters.bulk_write(updates, ordered=False)
+            logger.info("💾 Wrote coverage for %s clusters", len(updates))
+
+        elapsed = time.time() - start_time
+        logger.info(
+            "⏱️ Progress: %s/%s clusters processed (Skipped: %s, Elapsed: %.2fs)",
+            processed,
+            total_clusters,
+            skipped,
+            elapsed,
+        )
+
+    # Print final summary
+    elapsed = time.time() - start_time
+    logger.info(
+        "✨ Finished processing all %s clusters in %.2f seconds", processed, elapsed
+    )
+    logger.info(
+        "📊 Summary: %s total clusters, %s skipped, %s updated",
+        processed,
+        skipped,
+        processed - skipped,
+    )
+
+
 def fix_clusters():
     """Main function to fix cluster metadata."""
     # Connect to MongoDB
-    client = MongoClient(os.getenv("MONGODB_URI"))
+    client = get_client()
     db = client["sesgocero"]
     clusters = db["clusters"]
     articles = db["clean_articles"]
@@ -84,18 +232,23 @@ def fix_clusters():
     # Count total clusters
     total_clusters = clusters.count_documents({})
 
-    print(f"🔌 Connected to MongoDB: {client}")
-    print(f"📊 Found {total_clusters} clusters to process")
+    logger.info("🔌 Connected to MongoDB: %s", client)
+    logger.info("📊 Found %s clusters to process", total_clusters)
 
     # Add articles_count using aggregation pipeline
-    print("\n🔄 Updating articles count for all clusters...")
+    logger.info("🔄 Updating articles count for all clusters...")
+    # Only clusters whose count is stale are rewritten
     clusters_set = clusters.update_many(
-        {}, [{"$set": {"articles_count": {"$size": "$articles"}}}]
+        {"$expr": {"$ne": ["$articles_count", {"$size": "$articles"}]}},
+        [{"$set": {"articles_count": {"$size": "$articles"}}}],
     )
-    print(f"✅ Articles count set for {clusters_set.modified_count} clusters")
+    logger.info("✅ Articles count set for %s clusters", clusters_set.modified_count)
+
+    # Serves the articles_count filter and sort without an in-memory sort
+    clusters.create_index([("articles_count", pymongo.DESCENDING)])
 
     # Initialize coverage field for clusters that don't have it
-    print("\n🔄 Initializing coverage field for clusters without it...")
+    logger.info("🔄 Initializing coverage field for clusters without it...")
     clusters_set = clusters.update_many(
         {"coverage": {"$exists": False}},
         {
@@ -110,57 +263,29 @@ def fix_clusters():
             }
         },
     )
-    print(f"✅ Coverage field initialized for {clusters_set.modified_count} clusters")
+    logger.info(
+        "✅ Coverage field initialized for %s clusters", clusters_set.modified_count
+    )
 
-    processed = 0
-    skipped = 0
+    logger.info("🔄 Computing coverage server-side...")
     start_time = time.time()
-
-    print("\n🔄 Processing clusters and computing coverage...")
-    for i, cluster in enumerate(clusters.find().sort("articles_count", -1)):
-        processed += 1
-        cluster_name = cluster.get("name", "Unnamed")
-
-        print(f"\n📦 Processing cluster {processed}/{total_clusters}: {cluster_name}")
-
-        # Check if cluster should be skipped
-        skip, reason = should_skip_cluster(cluster)
-        if skip:
-            print(f"\t⏩ Skipping cluster - {reason}")
-            skipped += 1
-            continue
-
-        articles_count = len(cluster["articles"])
-        coverage = get_coverage(cluster["articles"], articles)
-
-        # Print coverage summary
-        print("\t📊 Coverage summary:")
-        for stance, count in coverage.items():
-            if count > 0:
-                print(f"\t\t{stance}: {count} articles")
-
-        # Update cluster with coverage data
-        clusters.update_one({"_id": cluster["_id"]}, {"$set": {"coverage": coverage}})
-        print(f"\t✅ Updated coverage for cluster {cluster_name}")
-
-        # Print progress every 10 clusters
-        if processed % 10 == 0:
-            elapsed = time.time() - start_time
-            print(
-                f"\n⏱️ Progress: {processed}/{total_clusters} clusters processed (Skipped: {skipped}, Elapsed: {elapsed:.2f}s)"
-            )
-
-    # Print final summary
-    elapsed = time.time() - start_time
-    print(f"\n✨ Finished processing all {processed} clusters in {elapsed:.2f} seconds")
-    print(
-        f"📊 Summary: {processed} total clusters, {skipped} skipped, {processed-skipped} updated"
-    )
-    print(f"🔌 Closing MongoDB connection...")
-    client.close()
-    print("✅ MongoDB connection closed")
+    try:
+        updated = update_coverage_server_side(clusters, articles)
+        elapsed = time.time() - start_time
+        logger.info(
+            "✅ Coverage recomputed for %s clusters in %.2f seconds", updated, elapsed
+        )
+    except OperationFailure as e:
+        logger.warning(
+            "⚠️ Server-side coverage failed (%s), computing it per cluster", e
+        )
+        update_coverage_client_side(clusters, articles, total_clusters)
 
 
 if __name__ == "__main__":
     # Run the fix_clusters function when executed directly
-    fix_clusters()
+    log_listener = setup_logging()
+    try:
+        fix_clusters()
+    finally:
+        log_listener.stop()
@@ -1,12 +1,30 @@
 # This script gets the data from the database and returns a JSON object with the data
 
-from pymongo import MongoClient
 from dotenv import load_dotenv
 import os
-import json
+import orjson
+from db import get_client
 
 load_dotenv()
 
+# Articles that still need cleaning: cleaned field is false or not present
+UNCLEANED_QUERY = {"cleaned": {"$ne": True}}
+# Partial indexes cannot express $ne, so a regular index covers both the
+# filter and the date sort
+UNCLEANED_INDEX = [("cleaned", 1), ("date", -1)]
+
+# Articles per cursor batch; load_data drains the cursor without pausing, so
+# large batches only cut getMore round trips (the server caps each at 16MB)
+LOAD_BATCH_SIZE = 5000
+
+
+def serialize_article(doc):
+    """Make an article JSON-friendly: string _id and content joined into one string."""
+    doc["_id"] = str(doc["_id"])
+    # Join content array into a string (Python strings need no re-encoding)
+    doc["content"] = " ".join(map(str, doc["content"]))
+    return doc
+
 
 def load_data():
     # Connect to the database
@@ -17,24 +35,29 @@ def load_data():
     if not all([mongo_uri, mongo_db, mongo_collection]):
         raise ValueError("Missing required environment variables")
 
-    client = MongoClient(mongo_uri)
+    client = get_client()
     db = client[str(mongo_db)]
     collection = db[str(mongo_collection)]
 
-    # Get all articles with date in descending order
-    # cleaned field is false or not present
-    result = collection.find().sort("date", -1)
+    # Already-cleaned articles are filtered out by the server, using the
+    # UNCLEANED_INDEX that data_cleaner creates
+    # Get all articles with date in descending order. Whole documents are
+    # read: data_cleaner keeps each article's structure, so any field left out
+    # here would be lost from clean_articles
+    cursor = (
+        collection.find(UNCLEANED_QUERY).sort("date", -1).batch_size(LOAD_BATCH_SIZE)
+    )
 
-    # Convert to list and handle ObjectId serialization
-    result = list(result)
-    for doc in result:
-        doc["_id"] = str(doc["_id"])
-        # Join content array into a string with UTF-8 encoding
-        doc["content"] = " ".join(
-            str(item).encode("utf-8").decode("utf-8") for item in doc["content"]
-        )
+    # Encode each article as it arrives instead of building a list of all of
+    # them first; orjson emits UTF-8 directly
+    encoded = bytearray(b"[")
+    for i, doc in enumerate(cursor):
+        if i:
+            encoded += b","
+        encoded += orjson.dumps(serialize_article(doc), default=str)
+    encoded += b"]"
 
-    return json.dumps(result, ensure_ascii=False)
+    return encoded.decode()
 
 
 if __name__ == "__main__":